@@ -1,6 +1,5 @@
 import argparse
 import os
-import subprocess
 import sys
 
 import vpype_cli
@@ -26,10 +25,7 @@ elif input_size == "a4":
     assert number == 2, "2 files required for A4 input"
 
 # make directory if it doesn't exist
-subprocess.Popen(
-    ["mkdir", "-p", "output/grid"],
-    stdout=subprocess.PIPE
-)
+os.makedirs("output/grid", exist_ok=True)
 
 if input_size == "a5":
     vpype_cli.execute(f"""
@@ -1,13 +1,14 @@
-import math
-
-
+import logging
 import math
 from typing import Tuple
 
 import numpy as np
 from shapely.coordinates import transform
+from shapely.creation import polygons
 from shapely.geometry.polygon import Polygon
 
+logger = logging.getLogger(__name__)
+
 
 def calculate_angle(p1: Tuple[float, float], p2: Tuple[float, float], p3: Tuple[float, float], use_360: bool = False) -> float:
     """
@@ -46,44 +47,139 @@ def calculate_angle(p1: Tuple[float, float], p2: Tuple[float, float], p3: Tuple[
     return angle_degrees
 
 
-def polygon_coord_windows(polygon):
-    coords = list(polygon.exterior.coords)
-    if coords[0] == coords[-1]:
+def offset_coords(coords: np.ndarray, distance: float | np.ndarray) -> np.ndarray:
+    """
+    Offset each vertex of a closed ring along the bisector of its corner.
+
+    The angle at each corner is measured from the previous vertex round to the next one in the range
+    [0, 360), the same as calculate_angle with use_360=True, and the vertex is moved along half that angle.
+    The whole ring is handled in one pass with numpy rather than vertex by vertex, and the trigonometry is
+    shared when offsetting by several distances at once.
+
+    Args:
+        coords: (N, 2) array of the ring's vertices, without the closing point repeated
+        distance: Distance to offset the edges by, or a 1-D array of D distances
+
+    Returns:
+        (N, 2) array of the offset vertices, or (D, N, 2) for an array of distances. Vertices where the
+        bisector is degenerate are left in place.
+    """
+    prev_coords = np.roll(coords, 1, axis=0)
+    next_coords = np.roll(coords, -1, axis=0)
+    vector1 = prev_coords - coords
+    vector2 = next_coords - coords
+
+    dot_product = (vector1 * vector2).sum(axis=1)
+    cross_product = vector1[:, 0] * vector2[:, 1] - vector1[:, 1] * vector2[:, 0]
+    angle = np.arctan2(cross_product, dot_product)
+    angle = np.where(angle < 0, angle + 2 * np.pi, angle)
+
+    bisect_angle = angle / 2
+    sin_bisect = np.sin(bisect_angle)
+    degenerate = sin_bisect == 0
+    if degenerate.any():
+        for p2 in coords[degenerate]:
+            logger.debug("Zero division error at %s", tuple(p2))
+
+    # how far each vertex moves for each unit of offset
+    direction_angle = np.arctan2(-vector1[:, 1], -vector1[:, 0]) + bisect_angle
+    direction = np.stack([np.cos(direction_angle), np.sin(direction_angle)], axis=1)
+    direction /= np.where(degenerate, 1, sin_bisect)[:, None]
+    direction[degenerate] = 0
+
+    return coords + np.multiply.outer(distance, direction)
+
+
+def create_offset_polygon(polygon, distance):
+    return Polygon(offset_coords(exterior_coords(polygon), distance))
+
+
+def create_offset_polygons(polygon, distances):
+    """
+    Offset a polygon by each of several distances, sharing the work between them.
+
+    Parameters:
+    polygon: shapely.geometry.Polygon - The polygon to offset
+    distances: sequence of float - The distances to offset by
+
+    Returns:
+    list of shapely.geometry.Polygon - One offset polygon per distance
+    """
+    return list(polygons(offset_coords(exterior_coords(polygon), np.asarray(distances))))
+
+
+def exterior_coords(polygon) -> np.ndarray:
+    coords = np.asarray(polygon.exterior.coords)
+    if np.array_equal(coords[0], coords[-1]):
         # Remove the last point if it's the same as the first
         coords = coords[:-1]
-    yield coords[-1], coords[0], coords[1]
-    for i in range(len(coords)-2):
-        yield coords[i], coords[i+1], coords[i+2]
-    yield coords[-2], coords[-1], coords[0]
+    return coords
 
 
-def offset_point(p1, p2, p3, distance):
-    angle = calculate_angle(p1, p2, p3, use_360=True)
+def rotation_matrix(angle_degrees: float) -> np.ndarray:
+    """
+    The 2x2 matrix that rotates points anticlockwise about the origin by the given angle.
+    """
+    angle = math.radians(angle_degrees)
+    return np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]])
 
-    bisect_angle = math.radians(angle/2)
 
-    # Calculate the offset distance
-    offset_distance = distance / math.sin(bisect_angle)
+def rotate_and_translate(geometry, angle_degrees, x, y):
+    """
+    Rotate a geometry about the origin and then move the origin to (x, y).
 
-    direction_angle = math.atan2(p2[1] - p1[1], p2[0] - p1[0]) + bisect_angle
+    This is a single pass over the coordinates, rather than the two geometry rebuilds of using
+    affinity.rotate and affinity.translate.
 
-    # Calculate the new point
-    new_x = p2[0] + offset_distance * math.cos(direction_angle)
-    new_y = p2[1] + offset_distance * math.sin(direction_angle)
-    return (new_x, new_y)
+    Parameters:
+    geometry: shapely.geometry.base.BaseGeometry - The geometry to transform, drawn around the origin
+    angle_degrees: float - Angle to rotate anticlockwise by in degrees
+    x, y: float - Where to move the origin to
 
+    Returns:
+    shapely.geometry.base.BaseGeometry - The transformed geometry
+    """
+    rotation = rotation_matrix(angle_degrees)
+    return transform(geometry, lambda coords: coords @ rotation.T + (x, y))
 
-def create_offset_polygon(polygon, distance):
-    new_coords = []
-    for p1, p2, p3 in polygon_coord_windows(polygon):
-        try:
-            new_coord = offset_point(p1, p2, p3, distance)
-            new_coords.append(new_coord)
-        except ZeroDivisionError:
-            print(f"Zero division error at {p1}, {p2}, {p3}")
-            new_coords.append(p2)
-            pass
-    return Polygon(new_coords)
+
+def perspective_coords(coords: np.ndarray, center_x: float, center_y: float, angle_degrees: float, distance: float) -> np.ndarray:
+    """
+    Apply the perspective of perspective_by_angle to an array of points.
+
+    Args:
+        coords: (N, 2) array of points
+        center_x, center_y: The centre of the geometry, which the view is turned about
+        angle_degrees: Angle in degrees (0° = front view, 90° = edge view)
+        distance: Virtual camera distance (affects perspective strength)
+
+    Returns:
+        (N, 2) array of the transformed points
+    """
+    # Convert angle to radians
+    angle = math.radians(angle_degrees)
+
+    # Translate points relative to center
+    rel_x = coords[:, 0] - center_x
+    rel_y = coords[:, 1] - center_y
+
+    # Calculate z-coordinate based on angle
+    z = rel_x * math.sin(angle)
+
+    # Calculate new x based on angle
+    x_rotated = rel_x * math.cos(angle)
+
+    # Apply perspective projection
+    scale = distance / (distance + z)
+
+    # Transform the points
+    new_coords = np.column_stack([center_x + x_rotated * scale, center_y + rel_y * scale])
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for point, new_point, point_z, point_scale in zip(coords, new_coords, z, scale):
+            logger.debug("%s -> %s [z=%s, scale=%s]", tuple(point), tuple(new_point), point_z, point_scale)
+
+    return new_coords
 
 
 def perspective_by_angle(geometry, angle_degrees, distance=10):
@@ -98,39 +194,47 @@ def perspective_by_angle(geometry, angle_degrees, distance=10):
     Returns:
     shapely.geometry.Polygon - The transformed polygon
     """
-    # Convert angle to radians
-    angle = math.radians(angle_degrees)
-    print(f"angle: {angle_degrees} degrees = {angle} radians")
+    # looking straight on there is no perspective to apply
+    if angle_degrees == 0:
+        return geometry
+
+    logger.debug("angle: %s degrees", angle_degrees)
 
     # Get the bounds and center of the polygon
     minx, miny, maxx, maxy = geometry.bounds
     center_x = (minx + maxx) / 2
     center_y = (miny + maxy) / 2
 
-    def transform_point(x, y):
-        # Translate point relative to center
-        rel_x = x - center_x
-        rel_y = y - center_y
+    # Apply transformation to all coordinates
+    return transform(geometry, lambda coords: perspective_coords(coords, center_x, center_y, angle_degrees, distance))
 
-        # Calculate z-coordinate based on angle
-        z = rel_x * math.sin(angle)
 
-        # Calculate new x based on angle
-        x_rotated = rel_x * math.cos(angle)
+def perspective_and_rotate(geometry, angle_degrees, rotation_degrees, x, y, distance=10):
+    """
+    Apply perspective_by_angle and then rotate the result about (x, y).
 
-        # Apply perspective projection
-        scale = distance / (distance + z)
+    The perspective isn't an affine transform, so the two can't be folded into one matrix, but they are
+    applied together in a single pass over the coordinates rather than rebuilding the geometry twice.
 
-        # Transform the point
-        new_x = center_x + x_rotated * scale
-        new_y = center_y + rel_y * scale
+    Parameters:
+    geometry: shapely.geometry.base.BaseGeometry - The geometry to transform
+    angle_degrees: float - Perspective angle in degrees (0° = front view, 90° = edge view)
+    rotation_degrees: float - Angle to rotate anticlockwise by in degrees
+    x, y: float - The point to rotate about
+    distance: float - Virtual camera distance (affects perspective strength)
 
-        print(f"({x}, {y}) -> ({new_x}, {new_y}) [z={z}, rel_x={rel_x} scale={scale}, x_rotated={x_rotated}]")
+    Returns:
+    shapely.geometry.base.BaseGeometry - The transformed geometry
+    """
+    logger.debug("angle: %s degrees, rotation: %s degrees", angle_degrees, rotation_degrees)
 
-        return new_x, new_y
+    minx, miny, maxx, maxy = geometry.bounds
+    center_x = (minx + maxx) / 2
+    center_y = (miny + maxy) / 2
+    rotation = rotation_matrix(rotation_degrees)
 
     def transform_all(coords):
-        return np.array([transform_point(x, y) for x, y in coords])
+        coords = perspective_coords(coords, center_x, center_y, angle_degrees, distance)
+        return (coords - (x, y)) @ rotation.T + (x, y)
 
-    # Apply transformation to all coordinates
     return transform(geometry, transform_all)
@@ -1,31 +1,43 @@
 from __future__ import annotations
 
+import functools
+import itertools
 import logging
 import math
 from dataclasses import dataclass
-from typing import Iterable
 
+import numpy as np
+import shapely
 import vsketch
-from shapely import affinity
+from shapely import unary_union
 from shapely.geometry.base import BaseGeometry
 from shapely.geometry.linestring import LineString
-from shapely.geometry.multilinestring import MultiLineString
 from shapely.geometry.multipolygon import MultiPolygon
-from shapely.geometry.point import Point
 from shapely.geometry.polygon import Polygon, LinearRing
-from shapely.linear import shortest_line
-from shapely.ops import unary_union, polygonize
+from shapely.ops import polylabel, polygonize
 from shapely.set_operations import difference
-from vpype import FONT_NAMES
 from vsketch import Vsketch
 
-from geo import create_offset_polygon, perspective_by_angle
+from geo import create_offset_polygon, create_offset_polygons, perspective_and_rotate, rotate_and_translate
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# rotation matrices for each of the six 60 degree steps around a snowflake
+SIXTY_DEGREE_ROTATIONS = np.array([
+    [[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]]
+    for angle in (math.radians(i * 60) for i in range(6))
+])
 
-@dataclass
+# the corners of a hexagon with a radius of 1 around the origin, which is where the rotations take (1, 0)
+UNIT_HEXAGON = SIXTY_DEGREE_ROTATIONS[:, :, 0]
+
+# the hexagon maths keeps coming back to these two
+TAN_30 = math.tan(math.radians(30))
+COS_30 = math.cos(math.radians(30))
+
+
+@dataclass(slots=True, frozen=True)
 class PolygonStoreEntry:
     layer: int
     geometry: BaseGeometry
@@ -34,7 +46,7 @@ class PolygonStoreEntry:
 class PolygonGroup:
     def __init__(self, name: str):
         self.polygons = []
-        self.groups = {}
+        self.group_names = set()
         self.name = name
 
     def add_polygon(self, polygon: Polygon | MultiPolygon, layer: int, name: str):
@@ -44,23 +56,56 @@ class PolygonGroup:
         self.polygons.append(PolygonStoreEntry(layer, geometry, name))
 
     def add_group(self, group: PolygonGroup, name: str, change_layer: int | None = None):
-        if name in self.groups:
+        if name in self.group_names:
             raise ValueError(f"Group {name} already exists")
-        self.groups[name] = group
+        self.group_names.add(name)
+        # groups are only ever drawn, so flatten them in now rather than walking the tree every time
+        self.polygons.extend(PolygonStoreEntry(entry.layer, entry.geometry, f"{self.name}/{entry.name}")
+                             for entry in group.all_geometries())
 
-    def all_geometries(self):
-        return self.polygons + [PolygonStoreEntry(entry.layer, entry.geometry, f"{self.name}/{entry.name}")
-                                for group in self.groups.values()
-                                for entry in group.all_geometries()]
+    def all_geometries(self) -> list[PolygonStoreEntry]:
+        return self.polygons
 
     def draw(self, vsk: Vsketch):
+        # each layer is plotted separately anyway, so draw a layer at a time and only switch stroke once per layer
+        by_layer: dict[int, list[PolygonStoreEntry]] = {}
         for entry in self.all_geometries():
-            try:
-                # if entry.layer == 2:
-                vsk.stroke(entry.layer)
-                vsk.geometry(entry.geometry)
-            except ValueError as e:
-                raise ValueError(f"Error drawing {entry.name}") from e
+            by_layer.setdefault(entry.layer, []).append(entry)
+        for layer, entries in by_layer.items():
+            # if layer == 2:
+            vsk.stroke(layer)
+            for entry in entries:
+                try:
+                    vsk.geometry(entry.geometry)
+                except ValueError as e:
+                    raise ValueError(f"Error drawing {entry.name}") from e
+
+class ProximityIndex:
+    """
+    Answers whether a point is within a fixed distance of any point added so far.
+
+    A card only has a few hundred stars, so checking them all at once with numpy is quicker than keeping a
+    spatial index up to date. The points are kept in arrays that double in size when they fill up.
+    """
+    def __init__(self, distance: float, capacity: int = 256):
+        self.distance_squared = distance * distance
+        self.xs = np.empty(capacity)
+        self.ys = np.empty(capacity)
+        self.count = 0
+
+    def add(self, x: float, y: float):
+        if self.count == len(self.xs):
+            self.xs = np.concatenate([self.xs, np.empty(len(self.xs))])
+            self.ys = np.concatenate([self.ys, np.empty(len(self.ys))])
+        self.xs[self.count] = x
+        self.ys[self.count] = y
+        self.count += 1
+
+    def is_near(self, x: float, y: float) -> bool:
+        dx = self.xs[:self.count] - x
+        dy = self.ys[:self.count] - y
+        return bool(np.any(dx * dx + dy * dy < self.distance_squared))
+
 
 @dataclass
 class BranchConfig:
@@ -118,6 +163,8 @@ class SnowflakeCardSketch(vsketch.SketchClass):
             (text_centre_x + psx/7, text_centre_y + text_size/2),
             (text_centre_x - psx/7, text_centre_y + text_size/2)
         ])
+        # every glitter star is checked against this, so prepare it once
+        shapely.prepare(credits_box)
         if self.debug:
             sketch_group.add_geom(credits_box, 1, "credits_box")
 
@@ -129,138 +176,162 @@ class SnowflakeCardSketch(vsketch.SketchClass):
             (psx-margin, psy-margin),
             (margin, psy-margin)]
         )
+        shapely.prepare(snowflake_field)
 
         # coords of front of card
         front_centre_x = self.centre_x_prop * psx
         front_centre_y = self.centre_y_prop * psy
 
         # draw a snowflake with sector ends
-        sector_star_outer = self.hexagon_star_with_sector_ends(front_centre_x, front_centre_y, self.outer_size_prop * psx, 15, sector_offset=self.sector_offset, sector_width=self.sector_width)
-        rotated_star_outer = affinity.rotate(sector_star_outer, origin=(front_centre_x, front_centre_y), angle=30+self.angle)
+        sector_star_outer = self.star_template(self.outer_size_prop * psx, 15, sector_offset=self.sector_offset, sector_width=self.sector_width)
+        rotated_star_outer = rotate_and_translate(sector_star_outer, 30+self.angle, front_centre_x, front_centre_y)
+        shapely.prepare(rotated_star_outer)
 
         if self.debug:
             sketch_group.add_polygon(rotated_star_outer, 10, "star1")
 
         # draw a triangular grid from the centre of the front of the card
         grid_points = self.triangular_grid(front_centre_x, front_centre_y, self.grid_spacing, psx, angle_degrees=30+self.angle)
-        used_points = []
 
-        # first, fill in the star outline
-        for x, y in grid_points:
-            in_star_outline = rotated_star_outer.contains(Point(x, y))
-            if in_star_outline:
-                sketch_group.add_geom(self.draw_a_star(x, y, self.snowflake_size, vsk.random), 2, f"star_{x}_{y}")
-                used_points.append((x, y))
+        glitter_flakes_size = self.snowflake_size * 1.5
+        # glitter is kept at least this far from any other star
+        used_points = ProximityIndex(glitter_flakes_size * 3)
 
-        selector = int(vsk.random(0, 4))
+        # numpy generator for drawing batches of random numbers, seeded from the sketch so it follows its seed
+        rng = np.random.default_rng(int(vsk.random(0, 2**32)))
 
-        glitter_flakes_size = self.snowflake_size * 1.5
+        # first, fill in the star outline, testing all of the grid points against it in one go
+        grid_xs, grid_ys = np.array(grid_points).T
+        in_star_outline = shapely.contains_xy(rotated_star_outer, grid_xs, grid_ys)
+        for x, y in itertools.compress(grid_points, in_star_outline):
+            sketch_group.add_geom(self.draw_a_star(x, y, self.snowflake_size, vsk.random, rng), 2, f"star_{x}_{y}")
+            used_points.add(x, y)
 
-        for i, (grid_x, grid_y) in enumerate(grid_points):
-            x = vsk.random(grid_x - glitter_flakes_size, grid_x + glitter_flakes_size)
-            y = vsk.random(grid_y - glitter_flakes_size, grid_y + glitter_flakes_size)
-            if not snowflake_field.contains(Point(x, y)):
-                continue
+        selector = int(vsk.random(0, 4))
 
-            line = shortest_line(mid_line, Point(x, y))
-            if line.length < glitter_flakes_size * 2.0:
+        # only every fifth grid point can have glitter, so just draw the random numbers for those, all in one go:
+        # where it is jittered to, whether it is kept, and how its star is tilted and spun
+        glitter_indices = np.arange(selector, len(grid_points), 5)
+        jitters = rng.uniform(-glitter_flakes_size, glitter_flakes_size, (len(glitter_indices), 2))
+        rolls = rng.uniform(0, 1, len(glitter_indices))
+        tilts = rng.uniform(-45, 45, len(glitter_indices))
+        spins = rng.uniform(0, 359, len(glitter_indices))
+
+        # these don't change from point to point
+        keep_chance = self.non_star_percentage / 100
+        fold_x = psx/2
+        fold_clearance = glitter_flakes_size * 2.0
+
+        for i, (jitter_x, jitter_y), roll, tilt, spin in zip(glitter_indices.tolist(), jitters.tolist(), rolls.tolist(),
+                                                             tilts.tolist(), spins.tolist()):
+            # the cheap check goes first, so most points are thrown away before any geometry is involved
+            if roll > keep_chance:
                 continue
 
-            if i%5 != selector:
+            grid_x, grid_y = grid_points[i]
+            x = grid_x + jitter_x
+            y = grid_y + jitter_y
+            # keep clear of the fold, which runs straight down the middle of the card
+            if abs(x - fold_x) < fold_clearance:
                 continue
 
-            if vsk.random(0, 1) > self.non_star_percentage / 100:
+            if not shapely.contains_xy(snowflake_field, x, y):
                 continue
 
             # check we are not too close to a point we have already used
-            too_close = any(math.hypot(used_x - x, used_y - y) < glitter_flakes_size * 3
-                        for used_x, used_y in used_points)
-            if not too_close:
-                star = self.draw_a_star(x, y, glitter_flakes_size, vsk.random)
-                perspective_star = perspective_by_angle(star, vsk.random(-45, 45), distance=20)
-                rotated_star = affinity.rotate(perspective_star, origin=(x, y), angle=vsk.random(0, 359))
+            if not used_points.is_near(x, y):
+                star = self.draw_a_star(x, y, glitter_flakes_size, vsk.random, rng)
+                rotated_star = perspective_and_rotate(star, tilt, spin, x, y, distance=20)
                 if snowflake_field.contains(rotated_star) and not credits_box.intersects(rotated_star):
                     sketch_group.add_geom(rotated_star, 3, f"star_{x}_{y}")
-                    used_points.append((x, y))
+                    used_points.add(x, y)
 
         sketch_group.draw(vsk)
 
-    def draw_a_star(self, x, y, radius, random):
+    def draw_a_star(self, x, y, radius, random, rng):
+        # both kinds of star are built around the origin, then turned and moved into place in one go
         # draw a star
         if random(0, 1) > self.dendrite_proportion:
-            sector_star = self.hexagon_star_with_sector_ends(
-                x=x,
-                y=y,
+            sector_star = self.star_template(
                 radius=radius,
                 thickness=self.snowflake_size * random(0.1,0.3),
                 sector_offset=random(self.snowflake_size/3, (self.snowflake_size/3)*2),
                 sector_width=random(0, self.snowflake_size/3)
             )
-            return affinity.rotate(sector_star, origin=(x, y), angle=self.angle)
+            return rotate_and_translate(sector_star, self.angle, x, y)
         else:
             # draw a dendrite
-            branch_configs = list(self.random_branch_config(radius, 0.1, random))
-            dendrite = self.stellar_dendrite(x, y, radius, branch_configs)
-            return affinity.rotate(dendrite, origin=(x, y), angle=self.angle)
+            branch_configs = self.random_branch_config(radius, 0.1, rng)
+            dendrite = self.stellar_dendrite(0, 0, radius, branch_configs)
+            return rotate_and_translate(dendrite, self.angle, x, y)
 
     def hexagon(self, x: float, y: float, radius: float) -> BaseGeometry:
-        points = []
-        for i in range(6):
-            angle = math.radians(i * 60)
-            points.append((x + radius * math.cos(angle), y + radius * math.sin(angle)))
-        return Polygon(points)
+        return shapely.polygons(UNIT_HEXAGON * radius + (x, y))
 
     def filled_hexagon_star_with_sector_ends(self, x: float, y: float, radius: float, thickness: float, sector_offset: float, sector_width: float, pen_width: float) -> PolygonGroup:
         group = PolygonGroup("filled_hexagon_star_with_sector_ends")
         star = self.hexagon_star(x, y, radius, thickness)
-        sector_ends = []
-        for i in range(6):
-            sector = self.elongated_hexagon(x + sector_offset, y, radius - sector_offset, thickness + sector_width)
+        sector = self.elongated_hexagon_coords(radius - sector_offset, thickness + sector_width) + (sector_offset, 0)
+        sector_ends = shapely.polygons(np.einsum("kij,pj->kpi", SIXTY_DEGREE_ROTATIONS, sector) + (x, y))
+        for i, rotated_sector in enumerate(sector_ends):
 #           filled_sector = self.filled_polygon(sector, -pen_width)
-            rotated_sector = affinity.rotate(geom=sector, origin=(x, y), angle=i*60)
-            sector_ends.append(rotated_sector)
             group.add_group(self.filled_polygon(rotated_sector, -pen_width), f"sector_{i}")
 
-        star_centre = difference(star, unary_union(sector_ends))
-        geoms = list(star_centre.geoms)
-        group.add_group(self.filled_polygon(geoms[0], pen_width), "star_centre")
+        # cutting the sectors away one at a time is quicker than unioning them first
+        star_centre = star
+        for sector_end in sector_ends:
+            star_centre = difference(star_centre, sector_end)
+        # there are no slivers left over when the sectors line up exactly, so this is usually a single polygon
+        if star_centre.geom_type != "Polygon":
+            star_centre = star_centre.geoms[0]
+        group.add_group(self.filled_polygon(star_centre, pen_width), "star_centre")
 
         return group
 
     def hexagon_star_with_sector_ends(self, x: float, y: float, radius: float, thickness: float, sector_offset: float, sector_width: float) -> BaseGeometry:
-        star = self.hexagon_star(x, y, radius, thickness)
-        sector_ends = []
-        for i in range(6):
-            sector = self.elongated_hexagon(x + sector_offset, y, radius - sector_offset, thickness + sector_width)
-            sector_ends.append(affinity.rotate(geom=sector, origin=(x, y), angle=i*60))
+        template = self.star_template(radius, thickness, sector_offset, sector_width)
+        return shapely.transform(template, lambda coords: coords + (x, y))
+
+    # the star with sector ends centred on the origin, these only differ by where they are so we build each one once
+    # and move it into place. The sketch object is recreated for each render so the cache can't be keyed on it.
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def star_template(radius: float, thickness: float, sector_offset: float, sector_width: float) -> BaseGeometry:
+        star = SnowflakeCardSketch._hexagon_star_at_origin(radius, thickness)
+        sector = SnowflakeCardSketch.elongated_hexagon_coords(radius - sector_offset, thickness + sector_width)
+        sector_ends = shapely.polygons(np.einsum("kij,pj->kpi", SIXTY_DEGREE_ROTATIONS, sector + (sector_offset, 0)))
         return unary_union([star, *sector_ends])
 
     def filled_hexagon_star(self, x: float, y: float, radius: float, thickness: float, pen_width: float) -> MultiPolygon:
         thickness_offset = 0
         polygons = [self.hexagon_star(x, y, radius, thickness)]
-        print(f"Creating filled hexagon star at {x}, {y} with radius {radius}, thickness {thickness} and pen_width {pen_width}")
+        logger.debug("Creating filled hexagon star at %s, %s with radius %s, thickness %s and pen_width %s", x, y, radius, thickness, pen_width)
         while thickness+thickness_offset > 0:
             thickness_offset -= pen_width * 2
-            print(f"Thickness offset: {thickness_offset}")
-            polygons.append(self.hexagon_star(x, y, radius+thickness_offset*math.tan(math.radians(30)), thickness+thickness_offset))
+            logger.debug("Thickness offset: %s", thickness_offset)
+            polygons.append(self.hexagon_star(x, y, radius+thickness_offset*TAN_30, thickness+thickness_offset))
         return MultiPolygon(polygons)
 
-    def filled_polygon(self, polygon: Polygon, pen_width: float) -> PolygonGroup:
+    def filled_polygon(self, polygon: Polygon | MultiPolygon, pen_width: float) -> PolygonGroup:
         group = PolygonGroup("filled_polygon")
+        if polygon.geom_type == "MultiPolygon":
+            # fill each part on its own, as they don't have a single exterior to offset
+            for i, part in enumerate(polygon.geoms):
+                group.add_group(self.filled_polygon(part, pen_width), f"part_{i}")
+            return group
         polygon_ring: LinearRing = polygon.exterior
         group.add_polygon(polygon, 1, "outer_polygon")
-        thickness_offset = 0
-        breakout = 50
-        while True:
-            thickness_offset -= pen_width
-            print(f"Thickness offset: {thickness_offset}")
-            offset = polygon_ring.offset_curve(thickness_offset)
+        # the fill can go no further in than the largest circle that fits inside the polygon, so that bounds the
+        # number of offsets we need to try
+        tolerance = abs(pen_width) / 2
+        inradius = polygon_ring.distance(polylabel(polygon, tolerance)) + tolerance
+        offsets = -pen_width * np.arange(1, math.ceil(inradius / abs(pen_width)) + 1)
+        # offset the ring by every distance in one go
+        for i, (thickness_offset, offset) in enumerate(zip(offsets.tolist(), shapely.offset_curve(polygon_ring, offsets, quad_segs=16))):
+            logger.debug("Thickness offset: %s", thickness_offset)
             if offset.is_empty:
                 break
-            group.add_polygon(Polygon(offset), 1, f"fill_polygon_{thickness_offset}")
-            breakout -= 1
-            if breakout < 0:
-                raise ValueError("Too many iterations")
+            group.add_polygon(Polygon(offset), 1, f"fill_polygon_{i}")
         return group
 
     def offset_my_way(self, polygon: Polygon, distance: float) -> Polygon:
@@ -271,30 +342,30 @@ class SnowflakeCardSketch(vsketch.SketchClass):
         group = PolygonGroup("filled_polygon_my_way")
         simplified_polygon = polygon.simplify(0.01)
 
-        for coord in simplified_polygon.exterior.coords:
-            print(f"coord: {coord}")
+        if logger.isEnabledFor(logging.DEBUG):
+            for coord in simplified_polygon.exterior.coords:
+                logger.debug("coord: %s", coord)
         group.add_polygon(simplified_polygon, 1, "outer_polygon")
-        offset_polygons = []
-        for i in range(8):
-            offset_polygon = create_offset_polygon(simplified_polygon, -pen_width * i)
-            offset_polygons.append(offset_polygon)
-            print(f"{list(offset_polygon.interiors)} offset_polygon.is_simple: {offset_polygon.is_simple} offset_polygon.is_valid: {offset_polygon.is_valid}")
+        offset_polygons = create_offset_polygons(simplified_polygon, -pen_width * np.arange(9))
+        for i, offset_polygon in enumerate(offset_polygons[:8]):
+            # the validity checks are GEOS calls, so skip them unless they will be logged
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s offset_polygon.is_simple: %s offset_polygon.is_valid: %s", list(offset_polygon.interiors), offset_polygon.is_simple, offset_polygon.is_valid)
             #group.add_polygon(offset_polygon, 1, f"fill_polygon_{pen_width}_{i}")
 
-        offset_polygons.append(create_offset_polygon(simplified_polygon, -pen_width * 8))
         group.add_polygon(offset_polygons[8], 2, f"fill_polygon_{pen_width}_8")
 
         test = unary_union(offset_polygons[8].exterior)
-        print(test)
+        logger.debug("%s", test)
         remaining = difference(simplified_polygon, test)
         holes = [Polygon(hole) for hole in remaining.interiors]
-        print(len(holes))
+        logger.debug("%s", len(holes))
 
 
 
-        print(test.geom_type)
+        logger.debug("%s", test.geom_type)
         for i, polygon in enumerate(polygonize(test)):
-            print(f"Polygon {i}: {polygon}")
+            logger.debug("Polygon %s: %s", i, polygon)
             union = unary_union([polygon, test])
             if union.area > offset_polygons[8].area:
                 continue
@@ -309,124 +380,143 @@ class SnowflakeCardSketch(vsketch.SketchClass):
         outer_hexagon_star = self.hexagon_star(x, y, radius, thickness)
         hexagon_star.add_polygon(outer_hexagon_star, 1, "outer_hexagon_star")
         ring: LinearRing = outer_hexagon_star.exterior
-        print(f"Creating filled hexagon star at {x}, {y} with radius {radius}, thickness {thickness} and pen_width {pen_width}")
+        logger.debug("Creating filled hexagon star at %s, %s with radius %s, thickness %s and pen_width %s", x, y, radius, thickness, pen_width)
 
-        thickness_offset = 0
-        while thickness+thickness_offset > 0:
-            thickness_offset -= pen_width
-            print(f"Thickness offset: {thickness_offset}")
-            offset = ring.offset_curve(thickness_offset)
-            hexagon_star.add_polygon(offset, 1, f"outer_hexagon_star_{thickness_offset}")
+        offsets = -pen_width * np.arange(1, math.ceil(thickness / pen_width) + 1)
+        for i, (thickness_offset, offset) in enumerate(zip(offsets.tolist(), shapely.offset_curve(ring, offsets, quad_segs=16))):
+            logger.debug("Thickness offset: %s", thickness_offset)
+            if offset.is_empty:
+                break
+            hexagon_star.add_polygon(offset, 1, f"outer_hexagon_star_{i}")
         return hexagon_star
 
-    def hexagon_star(self, x: float, y: float, radius: float, thickness: float) -> Polygon:
-        print(f"Creating hexagon star at {x}, {y} with radius {radius} and thickness {thickness}")
-        hexagons = []
-        for i in range(6):
-            elongated_hexagon = self.elongated_hexagon(x, y, radius, thickness)
-            hexagons.append(affinity.rotate(geom=elongated_hexagon, origin=(x, y), angle=i*60))
-        return unary_union(hexagons)
-
-    def elongated_hexagon(self, x: float, y: float, length: float, thickness: float, fix: bool = False) -> Polygon:
+    @staticmethod
+    def hexagon_star(x: float, y: float, radius: float, thickness: float) -> Polygon:
+        logger.debug("Creating hexagon star at %s, %s with radius %s and thickness %s", x, y, radius, thickness)
+        star = SnowflakeCardSketch._hexagon_star_at_origin(radius, thickness)
+        return shapely.transform(star, lambda coords: coords + (x, y))
+
+    # the same few stars are asked for over and over, so build each one once around the origin and move it into
+    # place afterwards
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _hexagon_star_at_origin(radius: float, thickness: float) -> Polygon:
+        inset_distance = TAN_30 * thickness * 0.5
+        # the sides of neighbouring arms cross half way between them, 30 degrees round from the arm
+        notch = (thickness * COS_30, thickness / 2)
+
+        if radius - inset_distance <= notch[0]:
+            # the arms are too stubby for their ends to clear the notches, so union them and let shapely work out
+            # the outline. Rotate one arm around the origin into all six positions in a single step
+            arm = SnowflakeCardSketch.elongated_hexagon_coords(radius, thickness)
+            arms = np.einsum("kij,pj->kpi", SIXTY_DEGREE_ROTATIONS, arm)
+            return unary_union(shapely.polygons(arms))
+
+        # otherwise we know the outline already: the end of each arm followed by the notch before the next one
+        arm_outline = np.array([
+            (radius - inset_distance, -thickness / 2),
+            (radius, 0),
+            (radius - inset_distance, thickness / 2),
+            notch
+        ])
+        outline = np.einsum("kij,pj->kpi", SIXTY_DEGREE_ROTATIONS, arm_outline).reshape(-1, 2)
+        # reversed so that it runs clockwise, the same way as the union of the arms does
+        return Polygon(outline[::-1])
+
+    @staticmethod
+    def elongated_hexagon(x: float, y: float, length: float, thickness: float, fix: bool = False) -> Polygon:
+        return Polygon(SnowflakeCardSketch.elongated_hexagon_coords(length, thickness, fix) + (x, y))
+
+    # the corners of an elongated hexagon starting at the origin and pointing along the x axis. There are only a
+    # handful of different sizes in a sketch so these are cached, and the arrays are read only as they are shared
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def elongated_hexagon_coords(length: float, thickness: float, fix: bool = False) -> np.ndarray:
         # calculate the distance from the left to the start of the line (essentially a line from the mid-point of the
         # left side at an angle of 30 degrees
-        inset_distance = math.tan(math.radians(30)) * thickness * 0.5
+        inset_distance = TAN_30 * thickness * 0.5
         if length <= inset_distance * 2:
             assert fix, f"Length ({length}) must be greater than inset distance ({inset_distance}) * 2"
             length = inset_distance * 2 + 0.1
 
         # draw a rectangle but with hexagonal ends at the left and right
-        points = [
-            # start at x, y
-            (x, y),
+        coords = np.array([
+            # start at the origin
+            (0, 0),
             # top left
-            (x + inset_distance, y - thickness / 2),
+            (inset_distance, -thickness / 2),
             # now the top right corner
-            (x + length - inset_distance, y - thickness / 2),
+            (length - inset_distance, -thickness / 2),
             # now the right end
-            (x + length, y),
+            (length, 0),
             # now the bottom right corner
-            (x + length - inset_distance, y + thickness / 2),
+            (length - inset_distance, thickness / 2),
             # now the bottom left corner
-            (x + inset_distance, y + thickness / 2)
-        ]
-
-        return Polygon(points)
+            (inset_distance, thickness / 2)
+        ])
+        coords.flags.writeable = False
+        return coords
 
     # output a series of coordinates of grid points for a grid that forms equilateral triangles, with the points
     # spaced by the given spacing and repeating the given number of times. The first point is at x, y and
     # subsequent points go outwards from there in all directions.
     def triangular_grid(self, x: float, y: float, spacing: float, distance: float, angle_degrees: int) -> list[tuple[float, float]]:
-        def in_accumulator(x: float, y: float, accumulator: list[tuple[float, float]]) -> bool:
-            for point in accumulator:
-                if math.isclose(point[0], x, abs_tol=0.00001) and math.isclose(point[1], y, abs_tol=0.00001):
-                    return True
-            return False
-
-        # Initialize with starting point
-        accumulator = [(x, y)]
-        # Queue of points to process
-        queue = [(x, y)]
-
-        while queue:
-            current_x, current_y = queue.pop(0)
-
-            # Generate points in all six directions
-            for i in range(6):
-                angle = math.radians(i * 60 + angle_degrees)
-                new_x = current_x + math.cos(angle) * spacing
-                new_y = current_y + math.sin(angle) * spacing
-
-                # Calculate distance from origin to new point
-                line_length = math.sqrt((new_x - x) ** 2 + (new_y - y) ** 2)
-
-                # If point is within distance and not already processed
-                if line_length <= distance and not in_accumulator(new_x, new_y, accumulator):
-                    accumulator.append((new_x, new_y))
-                    queue.append((new_x, new_y))
-
-        return accumulator
-
-
-    def random_branch_config(self, radius: float, thickness: float, random) -> Iterable[BranchConfig]:
-        fern_like = random(0, 1) < 0.2
-        number_of_branches = math.ceil(random(2, 4))
-        offset_start = random(radius/9, radius/5)
-        offset_end = random(radius*0.9, radius)
-        first_length = None
-        for branch in range(1, number_of_branches+1):
-            offset = ((offset_end - offset_start) / number_of_branches) * branch + offset_start
-            if fern_like:
-                # get shorter as we go out with a maximum of offset so they don't cross over
-                if first_length is None:
-                    first_length = offset
-                this_branch_reduction = first_length * branch / number_of_branches
-                length = first_length - random(this_branch_reduction*(5/6), this_branch_reduction)
-            else:
-                longest = min(offset, radius - offset)
-                length = random(longest/2, longest)
-            thickness = random(thickness*0.5, thickness)
-            yield BranchConfig(offset, length, thickness)
+        # the grid is a lattice, so generate it directly from two basis vectors 60 degrees apart rather than
+        # walking outwards and de-duplicating. With the basis vectors at 60 degrees to each other we need to go
+        # out to distance / sin(60) steps along each one to cover the whole circle
+        n = math.ceil(distance / (spacing * math.sin(math.pi / 3))) + 1
+        i, j = np.meshgrid(np.arange(-n, n + 1), np.arange(-n, n + 1))
+        i, j = i.ravel(), j.ravel()
+        angle = math.radians(angle_degrees)
+        dx = spacing * (i * math.cos(angle) + j * math.cos(angle + math.pi / 3))
+        dy = spacing * (i * math.sin(angle) + j * math.sin(angle + math.pi / 3))
+        mask = dx * dx + dy * dy <= distance * distance
+
+        # order the points ring by ring going outwards from x, y (the number of steps away on the grid) and then
+        # by the angle around the centre
+        ring = (np.abs(i) + np.abs(j) + np.abs(i + j)) // 2
+        order = np.lexsort((np.arctan2(dy, dx) % (2 * math.pi), ring))
+        order = order[mask[order]]
+
+        return list(zip((x + dx[order]).tolist(), (y + dy[order]).tolist()))
+
+
+    def random_branch_config(self, radius: float, thickness: float, rng: np.random.Generator) -> list[BranchConfig]:
+        fern_like = rng.random() < 0.2
+        number_of_branches = math.ceil(rng.uniform(2, 4))
+        offset_start = rng.uniform(radius/9, radius/5)
+        offset_end = rng.uniform(radius*0.9, radius)
+        branches = np.arange(1, number_of_branches+1)
+        offsets = ((offset_end - offset_start) / number_of_branches) * branches + offset_start
+        if fern_like:
+            # get shorter as we go out with a maximum of offset so they don't cross over
+            first_length = offsets[0]
+            branch_reductions = first_length * branches / number_of_branches
+            lengths = first_length - rng.uniform(branch_reductions*(5/6), branch_reductions)
+        else:
+            longest = np.minimum(offsets, radius - offsets)
+            lengths = rng.uniform(longest/2, longest)
+        # each branch is between half as thick as and as thick as the one before it
+        thicknesses = thickness * np.cumprod(rng.uniform(0.5, 1, number_of_branches))
+        return [BranchConfig(*config) for config in zip(offsets.tolist(), lengths.tolist(), thicknesses.tolist())]
 
     def stellar_dendrite(self, x: float, y: float, radius: float, branch_configs: list[BranchConfig]) -> BaseGeometry:
-        # Start with a hexagon star
-        lines = []
-        for i in range(6):
-            angle_degrees = i * 60
-            branch = LineString([(x, y), (x + radius * math.cos(math.radians(angle_degrees)),
-                                        y + radius * math.sin(math.radians(angle_degrees)))])
-            lines.append(branch)
-            for branch_config in branch_configs:
-                branch_start_x = x + branch_config.offset * math.cos(math.radians(angle_degrees))
-                branch_start_y = y + branch_config.offset * math.sin(math.radians(angle_degrees))
-                branch_end_left_x = branch_start_x + branch_config.length * math.cos(math.radians(angle_degrees-60))
-                branch_end_left_y = branch_start_y + branch_config.length * math.sin(math.radians(angle_degrees-60))
-                lines.append(LineString([(branch_start_x, branch_start_y), (branch_end_left_x, branch_end_left_y)]))
-                branch_end_right_x = branch_start_x + branch_config.length * math.cos(math.radians(angle_degrees+60))
-                branch_end_right_y = branch_start_y + branch_config.length * math.sin(math.radians(angle_degrees+60))
-                lines.append(LineString([(branch_start_x, branch_start_y), (branch_end_right_x, branch_end_right_y)]))
-
-        return MultiLineString(lines)
+        # Start with a hexagon star: one line out from the centre along each of the six arms
+        centre = np.array([x, y])
+        arms = np.stack([np.broadcast_to(centre, (6, 2)), centre + radius * UNIT_HEXAGON], axis=1)
+
+        # then the branches, which leave each arm 60 degrees either side of it
+        offsets = np.array([branch_config.offset for branch_config in branch_configs])
+        lengths = np.array([branch_config.length for branch_config in branch_configs])
+        branch_starts = centre + offsets[None, :, None] * UNIT_HEXAGON[:, None, :]
+        left_ends = branch_starts + lengths[None, :, None] * np.roll(UNIT_HEXAGON, 1, axis=0)[:, None, :]
+        right_ends = branch_starts + lengths[None, :, None] * np.roll(UNIT_HEXAGON, -1, axis=0)[:, None, :]
+        branches = np.stack([np.stack([branch_starts, left_ends], axis=2),
+                             np.stack([branch_starts, right_ends], axis=2)], axis=2).reshape(6, -1, 2, 2)
+
+        # each arm followed by its branches, left then right, building every line in one go
+        lines = np.concatenate([arms[:, None], branches], axis=1).reshape(-1, 2, 2)
+        return shapely.multilinestrings(shapely.linestrings(lines))
 
 
     # layers are:
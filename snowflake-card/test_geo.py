@@ -1,7 +1,8 @@
 import pytest
-from hamcrest import assert_that, close_to
+from hamcrest import assert_that, close_to, equal_to
+from shapely.geometry.polygon import Polygon
 
-from geo import calculate_angle
+from geo import calculate_angle, create_offset_polygon, create_offset_polygons, perspective_and_rotate, perspective_by_angle
 
 @pytest.mark.parametrize(
     "p1, p2, p3, expected",
@@ -20,4 +21,37 @@ from geo import calculate_angle
 )
 def test_calculate_angle(p1, p2, p3, expected):
     angle = calculate_angle(p1, p2, p3, use_360=True)
-    assert_that(angle, close_to(expected, delta=0.001))
\ No newline at end of file
+    assert_that(angle, close_to(expected, delta=0.001))
+
+def test_create_offset_polygon():
+    square = Polygon([(0, 0), (2, 0), (2, 2), (0, 2)])
+    offset = create_offset_polygon(square, 0.5)
+    expected = [(0.5, 0.5), (1.5, 0.5), (1.5, 1.5), (0.5, 1.5), (0.5, 0.5)]
+    for (x, y), (expected_x, expected_y) in zip(offset.exterior.coords, expected):
+        assert_that(x, close_to(expected_x, delta=0.001))
+        assert_that(y, close_to(expected_y, delta=0.001))
+
+def test_create_offset_polygons():
+    square = Polygon([(0, 0), (2, 0), (2, 2), (0, 2)])
+    offsets = create_offset_polygons(square, [0, 0.5])
+    assert_that(len(offsets), equal_to(2))
+    assert_that(offsets[0].area, close_to(4.0, delta=0.001))
+    assert_that(offsets[1].area, close_to(1.0, delta=0.001))
+
+def test_perspective_by_angle_straight_on():
+    square = Polygon([(0, 0), (2, 0), (2, 2), (0, 2)])
+    assert_that(perspective_by_angle(square, 0).equals(square), equal_to(True))
+
+def test_perspective_by_angle_narrows():
+    square = Polygon([(0, 0), (2, 0), (2, 2), (0, 2)])
+    minx, miny, maxx, maxy = perspective_by_angle(square, 30).bounds
+    assert_that(maxx - minx < 2, equal_to(True))
+
+def test_perspective_and_rotate_straight_on_only_rotates():
+    square = Polygon([(0, 0), (2, 0), (2, 2), (0, 2)])
+    rotated = perspective_and_rotate(square, 0, 90, 0, 0)
+    minx, miny, maxx, maxy = rotated.bounds
+    assert_that(minx, close_to(-2, delta=0.001))
+    assert_that(maxx, close_to(0, delta=0.001))
+    assert_that(miny, close_to(0, delta=0.001))
+    assert_that(maxy, close_to(2, delta=0.001))